@@ -3,7 +3,7 @@
 import csv
 from code_parser import extract_logic_blocks
 from pattern_matcher import detect_patterns
-from quantum_engine import build_quantum_circuit, run_quantum_analysis, format_score
+from quantum_engine import build_quantum_circuit, run_quantum_analysis, run_quantum_analysis_batch, format_score
 
 BRUTAL_TEST_CASES = [
     {
@@ -65,40 +65,57 @@ if random.random() < 0.09:
     }
 ]
 
+def _score_case(name, pattern):
+    # Per-case scoring, used when the batched call fails: one bad case can't sink the rest
+    try:
+        circuit = build_quantum_circuit(pattern)
+        score, _, _ = run_quantum_analysis(circuit, pattern)
+        pct, risk_label = format_score(score)
+        return f"{pct} ({risk_label})"
+    except Exception as e:
+        print(f"[ERROR] Quantum scoring failed for '{name}': {e}")
+        return "Error"
+
 def run_brutal_benchmark(output_csv="brutal_benchmark_results.csv"):
     rows = []
     print("BRUTAL QUANTUM Pattern Detection Benchmark:\n")
 
+    matched = []  # (row index, expected pattern) pairs that need a quantum score
     for test in BRUTAL_TEST_CASES:
         logic_blocks = extract_logic_blocks(test["code"])
         patterns = detect_patterns(logic_blocks)
-        detected = [p for p in patterns if p != "UNKNOWN"]
+        detected = list(dict.fromkeys(p for p in patterns if p != "UNKNOWN"))
         expected_pattern = test["pattern"]
 
-        # Format quantum score if matched
-        quantum_score = "N/A"
-        risk_label = ""
         if expected_pattern in detected:
-            try:
-                circuit = build_quantum_circuit(expected_pattern)
-                score, _, _ = run_quantum_analysis(circuit, expected_pattern)
-                pct, risk_label = format_score(score)
-                quantum_score = f"{pct} ({risk_label})"
-            except Exception as e:
-                quantum_score = "Error"
+            matched.append((len(rows), expected_pattern))
 
-        row = {
+        rows.append({
             "Case": test["name"],
             "Detected": ", ".join(detected) if detected else "UNKNOWN",
             "Expected": expected_pattern,
-            "QuantumScore": quantum_score
-        }
+            "QuantumScore": "N/A"
+        })
+
+    # Score every matched case in one batched simulator call
+    if matched:
+        try:
+            match_patterns = [pattern for _, pattern in matched]
+            circuits = [build_quantum_circuit(pattern) for pattern in match_patterns]
+            results = run_quantum_analysis_batch(circuits, match_patterns)
+            for (idx, _), (score, _, _) in zip(matched, results):
+                pct, risk_label = format_score(score)
+                rows[idx]["QuantumScore"] = f"{pct} ({risk_label})"
+        except Exception as e:
+            print(f"[WARN] Batched quantum scoring failed ({e}); scoring cases one by one")
+            for idx, pattern in matched:
+                rows[idx]["QuantumScore"] = _score_case(rows[idx]["Case"], pattern)
 
+    for row in rows:
         print(f"Test: {row['Case']}")
         print(f"  - Detected: {row['Detected']}")
         print(f"  - Expected: {row['Expected']}")
         print(f"  - Quantum Risk: {row['QuantumScore']}\n")
-        rows.append(row)
 
     # Save results to CSV
     try:
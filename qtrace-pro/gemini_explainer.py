@@ -1,7 +1,10 @@
 # gemini_explainer.py — BRUTAL QUANTUM BEAST EDITION
 
 import os
+import time
 import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
+from utils import split_pattern_sections
 
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 if not GOOGLE_API_KEY:
@@ -9,6 +12,17 @@ if not GOOGLE_API_KEY:
 
 genai.configure(api_key=GOOGLE_API_KEY)
 
+# Transient API failures (rate limits, timeouts, 5xx) are retried with exponential backoff;
+# anything else (bad key, blocked prompt, bad request) fails on the first attempt
+TRANSIENT_ERRORS = (
+    google_exceptions.ResourceExhausted,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.DeadlineExceeded,
+    google_exceptions.InternalServerError,
+)
+MAX_RETRIES = 3
+RETRY_BASE_DELAY = 1.0
+
 def explain_result(score, pattern, code_snippet):
     """
     Brutal, quantum-native Gemini explanation for ANY quantum logic anomaly.
@@ -40,11 +54,60 @@ YOUR TASK:
 - Assume the reader is smart but not a quantum security expert.
 - 4-8 sentences. Brutally honest and direct.
 """
-    try:
-        response = model.generate_content(prompt)
-        return response.text.strip()
-    except Exception as e:
-        return f"[Gemini error: {str(e)}]"
+    return _generate(model, prompt)
+
+def explain_results(results, code_snippet):
+    """
+    Explain several quantum analysis results for the same code in ONE Gemini call.
+    Args:
+        results (list): (score, pattern) pairs, one per detected pattern.
+        code_snippet (str): Full code snippet under analysis (sent once, not per pattern).
+    Returns:
+        dict: pattern -> explanation, or None if the Gemini call itself failed.
+              Only headers naming a requested pattern start a section; patterns
+              missing from the reply are left out, and callers fall back to
+              explain_result for those.
+    """
+    model = genai.GenerativeModel("gemini-1.5-flash-latest")
+    listing = "\n".join(f"- {pattern}: score {score:.2f}" for score, pattern in results)
+    prompt = f"""
+You are an elite cybersecurity expert with deep quantum computing knowledge.
+You are reviewing a code sample that has triggered a quantum-native threat detector.
+
+CODE UNDER ANALYSIS:
+--------------------
+{code_snippet}
+--------------------
+
+Detected quantum patterns and anomaly scores (0 = benign, 1 = most suspicious):
+{listing}
+
+YOUR TASK, separately for EACH pattern above:
+- Clearly explain what this pattern means in a *real* attack, with reference to quantum logic (entanglement, probabilistic triggers, hidden logic bombs, etc.)
+- State how rare or advanced this attack is in real-world malware/hacking.
+- Tell the reader exactly why a reviewer MUST investigate or remove it (even if a static tool would miss it).
+- Use strong, blunt language: DO NOT soften the risk.
+- Assume the reader is smart but not a quantum security expert.
+- 4-8 sentences per pattern. Brutally honest and direct.
+
+Start each pattern's section with a line of the form "### PATTERN_NAME" and nothing else on that line.
+"""
+    text = _generate(model, prompt)
+    if text.startswith("[Gemini error"):
+        return None
+    return split_pattern_sections(text, [pattern for _, pattern in results])
+
+def _generate(model, prompt):
+    for attempt in range(MAX_RETRIES):
+        try:
+            response = model.generate_content(prompt)
+            return response.text.strip()
+        except TRANSIENT_ERRORS as e:
+            if attempt == MAX_RETRIES - 1:
+                return f"[Gemini error: {str(e)}]"
+            time.sleep(RETRY_BASE_DELAY * 2 ** attempt)
+        except Exception as e:
+            return f"[Gemini error: {str(e)}]"
 
 # -------------- DEMO USAGE ---------------
 if __name__ == "__main__":
@@ -1,20 +1,17 @@
 import streamlit as st
+import io
 import time
 import numpy as np
 
 # Core modules
 from code_parser import extract_logic_blocks
 from pattern_matcher import detect_patterns
+from utils import block_call_targets
 from quantum_engine import (
     build_quantum_circuit, run_quantum_analysis, format_score,
-    circuit_to_text, visualize_quantum_state
+    cached_circuit_text, freeze_args, visualize_quantum_state,
+    QUANTUM_MAPPABLE_PATTERNS
 )
-from quantum_graph import plot_quantum_risk_graph
-from gemini_explainer import explain_result as generate_explanation
-from quantum_redteam import generate_python_redteam_suite
-
-from quantum_ml import block_to_features, brutal_quantum_anomaly_fit, brutal_quantum_anomaly_predict
-from benchmark import BRUTAL_TEST_CASES, run_brutal_benchmark
 
 # Initialize session state
 for var, default in [
@@ -22,11 +19,16 @@ for var, default in [
     ('detected', []),
     ('logic_blocks', []),
     ('quantum_scores', []),
+    ('quantum_results', []),
     ('graph_image', None),
     ('code_input', ''),
     ('ml_model', None),
     ('ml_results', {}),
     ('last_code', ''),
+    ('parse_src', None),
+    ('patterns', []),
+    ('upload_id', None),
+    ('upload_text', ''),
 ]:
     if var not in st.session_state:
         st.session_state[var] = default
@@ -40,6 +42,88 @@ brutal_pattern_args = {
     "CROSS_FUNCTION_QUANTUM_BOMB": {"func_probs": [0.31, 0.47, 0.99]}
 }
 
+# Placeholder state probabilities for ML features (shared, read-only)
+_EMPTY_STATE_PROBS = np.zeros(8)
+_EMPTY_STATE_PROBS.setflags(write=False)
+
+MAX_UPLOAD_BYTES = 5 * 1024 * 1024  # same as server.maxUploadSize, which Streamlit counts in MiB
+
+@st.cache_data(show_spinner=False)
+def _cached_benchmark():
+    # Benchmark inputs are fixed, so simulate them once per server, not per rerun
+    from benchmark import run_brutal_benchmark
+    return run_brutal_benchmark()
+
+@st.cache_resource(max_entries=256, show_spinner=False)
+def _cached_circuit(pattern, args_items=()):
+    # Circuits are pure in (pattern, args) and never mutated here, so one object is shared
+    return build_quantum_circuit(pattern, **dict(args_items))
+
+@st.cache_data(ttl=600, max_entries=256, show_spinner=False)
+def _cached_score(pattern, args_items=()):
+    # Simulating is the expensive step; reuse the sampled score for identical inputs
+    score, _, _ = run_quantum_analysis(_cached_circuit(pattern, args_items), pattern)
+    return float(score)
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def _parse_and_detect(code, language="python"):
+    # Pure function of the source text, so unchanged code skips the AST walk and regex sweeps
+    logic_blocks = extract_logic_blocks(code, language=language)
+    return logic_blocks, detect_patterns(logic_blocks)
+
+@st.cache_data(ttl=3600, max_entries=256, show_spinner=False)
+def _cached_explanation(score, pattern, code):
+    # Gemini round-trips dominate rerun latency; callers round `score` so FP jitter still hits
+    # Deferred: google-generativeai is heavy and the module raises without GOOGLE_API_KEY
+    from gemini_explainer import explain_result as generate_explanation
+    explanation = generate_explanation(score, pattern, code)
+    if explanation.startswith("[Gemini error"):
+        raise RuntimeError(explanation)  # don't cache transient API failures
+    return explanation
+
+class _IncompleteExplanations(Exception):
+    # A successful batch reply that lacks some sections: used for this rerun, never cached
+    def __init__(self, explanations):
+        super().__init__("Gemini batch reply is missing pattern sections")
+        self.explanations = explanations
+
+@st.cache_data(ttl=3600, max_entries=64, show_spinner=False)
+def _cached_explanations(score_patterns, code):
+    # One Gemini call (and one copy of the code in the prompt) for all patterns of an analysis
+    from gemini_explainer import explain_results
+    explanations = explain_results(score_patterns, code)
+    if explanations is None:
+        raise RuntimeError("Gemini batch explanation failed")  # don't cache failures
+    if any(pattern not in explanations for _, pattern in score_patterns):
+        raise _IncompleteExplanations(explanations)  # nor partial replies
+    return explanations
+
+@st.cache_resource(max_entries=32, show_spinner=False)
+def _fit_anomaly_model(X):
+    # IsolationForest uses a fixed random_state, so the fitted model is a pure function of X
+    from quantum_ml import brutal_quantum_anomaly_fit
+    return brutal_quantum_anomaly_fit(X)
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def _state_chart_pngs(pattern_items):
+    # PNG bytes (None on failure) per (pattern, args_items), all drawn on one shared figure
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    fig, ax = plt.subplots(figsize=(5, 2.5))
+    pngs = []
+    try:
+        for pattern, args_items in pattern_items:
+            try:
+                circuit = _cached_circuit(pattern, args_items)
+                buf = visualize_quantum_state(circuit, f"Quantum State ({pattern})", ax=ax)
+                pngs.append(buf.getvalue())
+            except Exception:
+                pngs.append(None)
+    finally:
+        plt.close(fig)
+    return pngs
+
 st.set_page_config(page_title="Q-Trace Pro — Quantum Python Security Analyzer", layout="wide")
 st.title("⚛️ Q-Trace Pro — Quantum Python Security Analyzer")
 st.markdown("""
@@ -70,64 +154,110 @@ def rare_bomb():
 
 file_code = default_code
 if uploaded_file is not None:
-    try:
-        file_code = uploaded_file.read().decode(errors="ignore")
-    except Exception as e:
-        st.error("Could not decode uploaded file.")
-        file_code = default_code
-
-code_input = st.text_area(
-    "Paste your Python code snippet:",
-    height=240,
-    value=st.session_state.code_input if st.session_state.code_input else file_code,
-    key="main_code_input"
-)
-st.session_state.code_input = code_input
+    if uploaded_file.size > MAX_UPLOAD_BYTES:
+        # Keep the rest of the page usable: report it and leave file_code at the default
+        st.error(f"File too large (limit {MAX_UPLOAD_BYTES // (1024 * 1024)} MB).")
+    elif st.session_state.upload_id == uploaded_file.file_id:
+        # Same upload as an earlier rerun: reuse its decoded text
+        file_code = st.session_state.upload_text
+    else:
+        try:
+            # Decode straight from the upload buffer instead of copying it to bytes first
+            uploaded_file.seek(0)
+            reader = io.TextIOWrapper(uploaded_file, encoding="utf-8", errors="ignore", newline="")
+            file_code = reader.read()
+            reader.detach()  # keep the upload buffer open for later reruns
+            st.session_state.upload_id = uploaded_file.file_id
+            st.session_state.upload_text = file_code
+        except Exception as e:
+            st.error("Could not decode uploaded file.")
+            file_code = default_code
 
-run_clicked = st.button("⚡️ Brutal Quantum Analysis")
+# Inside a form, edits only rerun the script on submit instead of re-analysing on every change
+with st.form("analysis_form"):
+    code_input = st.text_area(
+        "Paste your Python code snippet:",
+        height=240,
+        value=st.session_state.code_input if st.session_state.code_input else file_code,
+        key="main_code_input"
+    )
+    run_clicked = st.form_submit_button("⚡️ Brutal Quantum Analysis")
+st.session_state.code_input = code_input
 
 # Run analysis on button click or if new code
 if run_clicked or st.session_state.code_input != st.session_state.get('last_code', ''):
+    # Heavy deps (scikit-learn, networkx) are only imported on reruns that analyse
+    from quantum_ml import block_to_features, brutal_quantum_anomaly_predict
+    from quantum_graph import plot_quantum_risk_graph
+
     st.session_state.last_code = st.session_state.code_input
     st.session_state.analysis_done = True
 
     start_time = time.time()
 
+    # Same source as this session's last parse: skip even the st.cache_data key hashing.
+    # Compare the string itself: a hash key could collide and reuse another input's results
     try:
-        st.session_state.logic_blocks = extract_logic_blocks(code_input)
+        if st.session_state.parse_src != code_input:
+            st.session_state.logic_blocks, st.session_state.patterns = _parse_and_detect(code_input)
+            st.session_state.parse_src = code_input
+        patterns = st.session_state.patterns
     except Exception as e:
         st.error(f"Error parsing code: {str(e)}")
         st.stop()
 
     logic_blocks = st.session_state.logic_blocks
-    patterns = detect_patterns(logic_blocks)
-    st.session_state.detected = [p for p in patterns if p != "UNKNOWN"]
+    # Join each block's body once per analysis: call matching and the results panel reuse these
+    for block in logic_blocks:
+        block['body_joined'] = "".join(block['body'])
+        block['snippet'] = f"if {block['condition']}:\n    " + "\n    ".join(block['body'])
+    st.session_state.detected = list(dict.fromkeys(p for p in patterns if p != "UNKNOWN"))
 
-    # Build quantum circuits and calculate risk scores
-    feature_matrix = []
+    # Build quantum circuits and calculate risk scores, keeping everything the results
+    # panel shows so display-only reruns do no circuit, simulation or chart work
+    pattern_items = tuple(
+        (pattern, freeze_args(brutal_pattern_args.get(pattern, {})))
+        for pattern in st.session_state.detected
+    )
+    state_pngs = _state_chart_pngs(pattern_items)
+    # ML features fill rows of one float32 array (allocated once the row width is known);
+    # IsolationForest works in float32 internally, so nothing is lost
+    feature_matrix = None
+    n_feature_rows = 0
     quantum_scores = []
-    for i, pattern in enumerate(st.session_state.detected):
-        args = brutal_pattern_args.get(pattern, {})
-        circuit = build_quantum_circuit(pattern, **args)
-        if circuit:
-            score, _, _ = run_quantum_analysis(circuit, pattern)
-            pct, risk_label = format_score(score)
+    quantum_results = []
+    for i, (pattern, args_items) in enumerate(pattern_items):
+        result = {"pattern": pattern, "mappable": pattern in QUANTUM_MAPPABLE_PATTERNS}
+        if result["mappable"]:
+            score = _cached_score(pattern, args_items)
             quantum_scores.append(score)
+            pct, risk_label = format_score(score)
+            result.update(
+                score=score,
+                pct=pct,
+                risk_label=risk_label,
+                circuit_text=cached_circuit_text(pattern, args_items),
+                state_png=state_pngs[i],
+            )
             # Build feature matrix for ML
             if i < len(logic_blocks):
                 block = logic_blocks[i]
-                state_probs = np.zeros(8)  # dummy state probs
-                feats = block_to_features(block, score, state_probs)
-                feature_matrix.append(feats)
+                feats = block_to_features(block, score, _EMPTY_STATE_PROBS)
+                if feature_matrix is None:
+                    feature_matrix = np.empty((len(pattern_items), feats.shape[0]), dtype=np.float32)
+                feature_matrix[n_feature_rows] = feats
+                n_feature_rows += 1
         else:
             quantum_scores.append(0)
+        quantum_results.append(result)
 
     st.session_state.quantum_scores = quantum_scores
+    st.session_state.quantum_results = quantum_results
 
     # Train ML model if enabled
-    if use_ml and len(feature_matrix) > 1:
-        X = np.array(feature_matrix)
-        model = brutal_quantum_anomaly_fit(X)
+    if use_ml and n_feature_rows > 1:
+        X = feature_matrix[:n_feature_rows]
+        model = _fit_anomaly_model(X)
         preds, scores = brutal_quantum_anomaly_predict(model, X)
         st.session_state.ml_model = model
         st.session_state.ml_results = {
@@ -138,13 +268,9 @@ if run_clicked or st.session_state.code_input != st.session_state.get('last_code
         st.session_state.ml_model = None
         st.session_state.ml_results = {}
 
-    # Build entanglement graph
+    # Build entanglement graph: link each block to the blocks whose body mentions one of its calls
     entangled_pairs = [
-        (i, j)
-        for i, block in enumerate(logic_blocks)
-        for call in block['calls']
-        for j, blk in enumerate(logic_blocks)
-        if call in "".join(blk['body'])
+        (i, j) for i, targets in enumerate(block_call_targets(logic_blocks)) for j in targets
     ]
     try:
         buf = plot_quantum_risk_graph(
@@ -153,7 +279,7 @@ if run_clicked or st.session_state.code_input != st.session_state.get('last_code
             entangled_pairs=entangled_pairs,
             streamlit_buf=True
         )
-        st.session_state.graph_image = buf
+        st.session_state.graph_image = buf.getvalue()  # raw PNG bytes: no BytesIO re-read per rerun
     except Exception as e:
         st.warning(f"Graph generation failed: {e}")
 
@@ -163,7 +289,6 @@ if run_clicked or st.session_state.code_input != st.session_state.get('last_code
 if st.session_state.analysis_done:
     detected = st.session_state.detected
     logic_blocks = st.session_state.logic_blocks
-    quantum_scores = st.session_state.quantum_scores
 
     st.subheader("🔬 Detected Quantum-Native Pattern(s)")
     if detected:
@@ -173,33 +298,53 @@ if st.session_state.analysis_done:
 
     st.subheader("🧩 Extracted Logic Blocks")
     for block in logic_blocks:
-        st.code(f"if {block['condition']}:\n    " + "\n    ".join(block['body']), language="python")
+        st.code(block['snippet'], language="python")
         if block['calls']:
             st.caption("Calls: " + ", ".join(block['calls']))
 
     st.subheader("⚛️ Quantum Pattern Analyses")
-    for i, pattern in enumerate(detected):
-        args = brutal_pattern_args.get(pattern, {})
-        circuit = build_quantum_circuit(pattern, **args)
+    # Fetch missing explanations in one batched call; patterns a successful reply doesn't
+    # cover fall back to the per-pattern call below. If the batch call itself fails, Gemini
+    # is treated as unavailable for this rerun and no per-pattern calls are made.
+    pending = [r for r in st.session_state.quantum_results if r["mappable"] and "explanation" not in r]
+    gemini_down = False
+    if len(pending) > 1:
+        try:
+            explanations = _cached_explanations(
+                tuple((round(float(r["score"]), 3), r["pattern"]) for r in pending), code_input
+            )
+        except _IncompleteExplanations as e:
+            explanations = e.explanations
+        except Exception:
+            gemini_down = True
+            explanations = {}
+        for r in pending:
+            if r["pattern"] in explanations:
+                r["explanation"] = explanations[r["pattern"]]
+    for result in st.session_state.quantum_results:
+        pattern = result["pattern"]
         st.markdown(f"### Pattern: `{pattern}`")
-        if circuit:
-            score = quantum_scores[i] if i < len(quantum_scores) else 0
-            pct, risk_label = format_score(score)
-            st.metric("Quantum Risk", pct, risk_label)
-            st.code(circuit_to_text(circuit))
-            try:
-                img = visualize_quantum_state(circuit, f"Quantum State ({pattern})")
-                st.image(img, caption=f"Quantum State Probabilities ({pattern})", width=350)
-            except Exception:
+        if result["mappable"]:
+            st.metric("Quantum Risk", result["pct"], result["risk_label"])
+            st.code(result["circuit_text"])
+            if result["state_png"]:
+                st.image(result["state_png"], caption=f"Quantum State Probabilities ({pattern})", width=350)
+            else:
                 st.info("Quantum state chart unavailable for this pattern.")
             # Gemini AI Explanation — always show something, even for unknown
-            try:
-                explanation = generate_explanation(score, pattern, code_input)
-                if explanation:
-                    st.markdown("**Gemini AI Explanation:**")
-                    st.info(explanation)
-            except Exception as ex:
+            if gemini_down and "explanation" not in result:
                 st.warning("Gemini AI Explanation unavailable.")
+            else:
+                try:
+                    # Kept on the result once fetched; failures are retried on the next rerun
+                    if "explanation" not in result:
+                        result["explanation"] = _cached_explanation(round(float(result["score"]), 3), pattern, code_input)
+                    explanation = result["explanation"]
+                    if explanation:
+                        st.markdown("**Gemini AI Explanation:**")
+                        st.info(explanation)
+                except Exception as ex:
+                    st.warning("Gemini AI Explanation unavailable.")
         else:
             st.warning("⚠️ No valid quantum circuit built for this pattern.")
 
@@ -220,6 +365,7 @@ if st.session_state.analysis_done:
 
     # Red Team Samples
     if st.checkbox("Generate Red Team Suite (Sample Attacks)"):
+        from quantum_redteam import generate_python_redteam_suite  # only needed behind this checkbox
         st.subheader("🛠️ Quantum Red Team Code Samples")
         redteam_samples = generate_python_redteam_suite(3)
         for sample in redteam_samples:
@@ -229,15 +375,14 @@ if run_benchmark:
     st.subheader("📊Quantum Benchmark Results")
     try:
         # run_brutal_benchmark must return a list of dicts (not just print!)
-        benchmark_results = run_brutal_benchmark()
-        display_data = []
-        for result in benchmark_results:
-            display_data.append({
-                "Test Case": result["Case"],
-                "Detected": result["Detected"],
-                "Expected": result["Expected"],
-                "Quantum Risk": result["QuantumScore"]
-            })
+        benchmark_results = _cached_benchmark()
+        # Column-oriented dict: st.table builds columns directly, no per-row dict conversion
+        display_data = {
+            "Test Case": [result["Case"] for result in benchmark_results],
+            "Detected": [result["Detected"] for result in benchmark_results],
+            "Expected": [result["Expected"] for result in benchmark_results],
+            "Quantum Risk": [result["QuantumScore"] for result in benchmark_results],
+        }
         st.table(display_data)
     except Exception as e:
         st.error("🚨 Failed to run benchmark")
@@ -9,32 +9,67 @@ class LogicPattern:
     CHAINED_QUANTUM_BOMB = "CHAINED_QUANTUM_BOMB"
     UNKNOWN = "UNKNOWN"
 
-# -- Pattern matching helpers --
+# -- Pattern bit flags: detect_patterns ORs these into one int and expands it once --
+
+_PATTERN_ORDER = (
+    LogicPattern.PROBABILISTIC_BOMB,
+    LogicPattern.ENTANGLED_BOMB,
+    LogicPattern.CHAINED_QUANTUM_BOMB,
+    LogicPattern.QUANTUM_STEGANOGRAPHY,
+    LogicPattern.QUANTUM_ANTIDEBUG,
+    LogicPattern.CROSS_FUNCTION_QUANTUM_BOMB,
+)
+_PROBABILISTIC_BIT = 1 << 0
+_ENTANGLED_BIT = 1 << 1
+_CHAINED_BIT = 1 << 2
+_STEGO_BIT = 1 << 3
+_ANTIDEBUG_BIT = 1 << 4
+_CROSS_FUNCTION_BIT = 1 << 5
+
+# -- Keyword tables (module-level tuples: built once, never mutated) --
+
+DANGER_KEYWORDS = (
+    r"os\.system", r"exec", r"subprocess\.", r"shutdown", r"selfdestruct",
+    r"grant_root", r"open.*w", r"delete", r"remove", r"pickle", r"eval",
+    r"marshal", r"write", r"chmod", r"socket\.create_connection", r"connect",
+    r"download", r"malicious", r"payload", r"reverse_shell", r"exploit"
+)
+
+RANDOMNESS_KEYWORDS = (
+    r"random\.random", r"random\.randint", r"random\.choice",
+    r"secrets\.randbelow", r"np\.random", r"quantum_rng", r"qrng",
+    r"crypto\.random", r"secrets\.token_bytes", r"random\.uniform"
+)
+
+ANTIDEBUG_KEYWORDS = (
+    r"time\.sleep", r"signal\.pause", r"inspect\.", r"sys\.settrace",
+    r"ptrace", r"anti_debug", r"traceback", r"__debug__", r"getframeinfo",
+    r"debugger", r"pdb\.", r"breakpoint", r"wait_for_input", r"input.*"
+)
+
+# -- Compiled regexes (compiled once at import instead of going through re's cache per call) --
+
+def _any_of(keywords):
+    # One alternation per table: a single scan of the statement instead of one per keyword
+    return re.compile("|".join(f"(?:{kw})" for kw in keywords))
+
+_DANGER_RE = _any_of(DANGER_KEYWORDS)
+_RANDOMNESS_RE = _any_of(RANDOMNESS_KEYWORDS)
+_ANTIDEBUG_RE = _any_of(ANTIDEBUG_KEYWORDS)
+_CHAINED_CALL_RE = re.compile(r'danger|root|admin|hack|backdoor|malicious')
+_CHAIN_COND_RE = re.compile(r"\w+")
+_STEGO_RE = re.compile(r'encode|decode|stego|bitwise|xor|hide|obfuscate')
+
+# -- Pattern matching helpers (callers pass already lower-cased text) --
 
 def _is_dangerous_call(stmt):
-    danger_keywords = [
-        r"os\.system", r"exec", r"subprocess\.", r"shutdown", r"selfdestruct",
-        r"grant_root", r"open.*w", r"delete", r"remove", r"pickle", r"eval",
-        r"marshal", r"write", r"chmod", r"socket\.create_connection", r"connect",
-        r"download", r"malicious", r"payload", r"reverse_shell", r"exploit"
-    ]
-    return any(re.search(kw, stmt.lower()) for kw in danger_keywords)
+    return _DANGER_RE.search(stmt) is not None
 
 def _is_randomness(stmt):
-    randomness_keywords = [
-        r"random\.random", r"random\.randint", r"random\.choice",
-        r"secrets\.randbelow", r"np\.random", r"quantum_rng", r"qrng",
-        r"crypto\.random", r"secrets\.token_bytes", r"random\.uniform"
-    ]
-    return any(re.search(kw, stmt.lower()) for kw in randomness_keywords)
+    return _RANDOMNESS_RE.search(stmt) is not None
 
 def _is_antidebug(stmt):
-    antidbg_keywords = [
-        r"time\.sleep", r"signal\.pause", r"inspect\.", r"sys\.settrace",
-        r"ptrace", r"anti_debug", r"traceback", r"__debug__", r"getframeinfo",
-        r"debugger", r"pdb\.", r"breakpoint", r"wait_for_input", r"input.*"
-    ]
-    return any(re.search(kw, stmt.lower()) for kw in antidbg_keywords)
+    return _ANTIDEBUG_RE.search(stmt) is not None
 
 def detect_patterns(logic_blocks):
     """
@@ -42,7 +77,7 @@ def detect_patterns(logic_blocks):
     Each block: {"condition": "...", "body": [stmts], "calls": [funcs]}
     Returns: list of detected quantum/adversarial patterns (Python only).
     """
-    patterns = set()
+    mask = 0
     for block in logic_blocks:
         cond = block.get("condition", "")
         body = block.get("body", [])
@@ -52,59 +87,62 @@ def detect_patterns(logic_blocks):
             continue
 
         cond_lower = cond.lower()
-        body_all = " ".join([str(b).lower() for b in body])
-        call_all = " ".join([str(c).lower() for c in calls])
+        # Lower-case each body line and call name once; every check below reuses these
+        body_lower = [str(b).lower() for b in body]
+        body_all = " ".join(body_lower)
+        calls_lower = [str(c).lower() for c in calls]
 
         # Support "return ..." as condition (from inlined logic)
         cond_expr = cond_lower
         if cond_lower.strip().startswith("return "):
             cond_expr = cond_lower.replace("return", "", 1).strip()
 
+        # Randomness in the condition gates most patterns below; evaluate it once
+        cond_random = _is_randomness(cond_expr)
+
         # Count random/dangerous elements for ALL lines (including "return ...")
-        total_lines = [cond_expr] + [str(b).lower() for b in body]
-        random_count = sum(_is_randomness(line) for line in total_lines)
-        danger_count = sum(_is_dangerous_call(str(stmt)) for stmt in body)
+        random_count = cond_random + sum(_is_randomness(line) for line in body_lower)
+        danger_count = sum(_is_dangerous_call(line) for line in body_lower)
 
         # PROBABILISTIC BOMB: Randomness in condition + dangerous action
-        if _is_randomness(cond_expr) and danger_count > 0:
-            patterns.add(LogicPattern.PROBABILISTIC_BOMB)
+        if cond_random and danger_count > 0:
+            mask |= _PROBABILISTIC_BIT
 
         # ENTANGLED BOMB: >=2 random and >=2 danger
         if random_count >= 2 and danger_count >= 2:
-            patterns.add(LogicPattern.ENTANGLED_BOMB)
+            mask |= _ENTANGLED_BIT
 
         # CHAINED BOMB: dangerous call in chain (via function/calls) or chained calls in condition
-        for call in calls:
-            if re.search(r'danger|root|admin|hack|backdoor|malicious', str(call).lower()):
-                patterns.add(LogicPattern.CHAINED_QUANTUM_BOMB)
+        for call in calls_lower:
+            if _CHAINED_CALL_RE.search(call):
+                mask |= _CHAINED_BIT
                 break
 
         # Detect "check_1() and check_2() ..." chains as chained bomb if dangerous
         if (
-            re.search(r"\w+", cond_expr) and " and " in cond_expr
+            _CHAIN_COND_RE.search(cond_expr) and " and " in cond_expr
             and danger_count > 0
         ):
-            patterns.add(LogicPattern.CHAINED_QUANTUM_BOMB)
+            mask |= _CHAINED_BIT
 
         # QUANTUM STEGANOGRAPHY: Hiding data using randomness
-        stego_indicators = r'encode|decode|stego|bitwise|xor|hide|obfuscate'
-        if re.search(stego_indicators, body_all) and _is_randomness(cond_expr):
-            patterns.add(LogicPattern.QUANTUM_STEGANOGRAPHY)
+        if cond_random and _STEGO_RE.search(body_all):
+            mask |= _STEGO_BIT
 
         # QUANTUM ANTIDEBUG: Anti-debugging + randomness
-        if _is_antidebug(body_all) and _is_randomness(cond_expr):
-            patterns.add(LogicPattern.QUANTUM_ANTIDEBUG)
+        if cond_random and _is_antidebug(body_all):
+            mask |= _ANTIDEBUG_BIT
 
         # CROSS-FUNCTION BOMB: Randomness in condition + function call graph
         if len(calls) > 0 and (
-            _is_randomness(cond_expr) or any(_is_randomness(call) for call in calls)
+            cond_random or any(_is_randomness(call) for call in calls_lower)
         ):
-            patterns.add(LogicPattern.CROSS_FUNCTION_QUANTUM_BOMB)
+            mask |= _CROSS_FUNCTION_BIT
 
-    if not patterns:
-        patterns.add(LogicPattern.UNKNOWN)
+    if not mask:
+        return [LogicPattern.UNKNOWN]
 
-    return list(patterns)
+    return [pattern for i, pattern in enumerate(_PATTERN_ORDER) if mask >> i & 1]
 
 # --- Example brutal quantum logic input for testing ---
 if __name__ == "__main__":
@@ -2,26 +2,17 @@
 quantum_engine.py — Brutal Quantum Innovator Edition
 Complete brutal quantum simulation with full CHAINED_QUANTUM_BOMB support.
 """
+import functools
 import cirq
 import numpy as np
-import matplotlib.pyplot as plt
 from io import BytesIO
 
 def build_quantum_circuit(pattern, **kwargs):
-    if pattern == "PROBABILISTIC_BOMB":
-        return probabilistic_bomb_circuit(kwargs.get("prob", 0.2))
-    elif pattern == "ENTANGLED_BOMB":
-        return entangled_bomb_circuit(kwargs.get("probs", [0.2, 0.5]))
-    elif pattern == "CHAINED_QUANTUM_BOMB":
-        return chained_quantum_bomb_circuit(kwargs.get("chain_length", 3), kwargs.get("prob", 0.3))
-    elif pattern == "QUANTUM_STEGANOGRAPHY":
-        return stego_circuit(kwargs.get("encode_val", 1))
-    elif pattern == "QUANTUM_ANTIDEBUG":
-        return antidebug_circuit(kwargs.get("prob", 0.1))
-    elif pattern == "CROSS_FUNCTION_QUANTUM_BOMB":
-        return cross_func_bomb_circuit(kwargs.get("func_probs", [0.3, 0.5, 0.8]))
-    else:
+    spec = CIRCUIT_BUILDERS.get(pattern)
+    if spec is None:
         return None
+    builder, params = spec
+    return builder(*(kwargs.get(name, default) for name, default in params))
 
 def probabilistic_bomb_circuit(prob=0.2):
     qubit = cirq.LineQubit(0)
@@ -93,16 +84,53 @@ def cross_func_bomb_circuit(func_probs=[0.3, 0.5, 0.8]):
         circuit.append(cirq.measure(q, key=f'f{i}'))
     return circuit
 
-def run_quantum_analysis(circuit, pattern="PROBABILISTIC_BOMB", shots=1024):
+# pattern -> (builder, ((kwarg, default), ...)) with kwargs in the builder's argument order
+CIRCUIT_BUILDERS = {
+    "PROBABILISTIC_BOMB": (probabilistic_bomb_circuit, (("prob", 0.2),)),
+    "ENTANGLED_BOMB": (entangled_bomb_circuit, (("probs", [0.2, 0.5]),)),
+    "CHAINED_QUANTUM_BOMB": (chained_quantum_bomb_circuit, (("chain_length", 3), ("prob", 0.3))),
+    "QUANTUM_STEGANOGRAPHY": (stego_circuit, (("encode_val", 1),)),
+    "QUANTUM_ANTIDEBUG": (antidebug_circuit, (("prob", 0.1),)),
+    "CROSS_FUNCTION_QUANTUM_BOMB": (cross_func_bomb_circuit, (("func_probs", [0.3, 0.5, 0.8]),)),
+}
+
+# Patterns build_quantum_circuit can map; test membership here instead of building to check
+QUANTUM_MAPPABLE_PATTERNS = frozenset(CIRCUIT_BUILDERS)
+
+# Shared simulator: construction is not free and it keeps no per-circuit state
+_SIMULATOR = cirq.Simulator()
+
+# Patterns scored on "all qubits triggered" rather than a single measurement
+MULTI_QUBIT_PATTERNS = frozenset({"CHAINED_QUANTUM_BOMB", "ENTANGLED_BOMB", "CROSS_FUNCTION_QUANTUM_BOMB"})
+
+def run_quantum_analysis(circuit, pattern="PROBABILISTIC_BOMB", shots=1024, simulator=None):
     if circuit is None:
         return 0.0, {}, {}
-    simulator = cirq.Simulator()
-    result = simulator.run(circuit, repetitions=shots)
+    result = (simulator or _SIMULATOR).run(circuit, repetitions=shots)
     measurements = result.measurements
+    return _score_measurements(measurements, pattern), measurements, circuit
+
+def run_quantum_analysis_batch(circuits, patterns, shots=1024, simulator=None):
+    """
+    Run several (circuit, pattern) pairs through one simulator.run_batch call.
+    Returns a list of (score, measurements, circuit), same as run_quantum_analysis.
+    """
+    circuits, patterns = list(circuits), list(patterns)
+    results = [(0.0, {}, {}) for _ in circuits]
+    runnable = [i for i, circuit in enumerate(circuits) if circuit is not None]
+    if runnable:
+        batch = (simulator or _SIMULATOR).run_batch(
+            [circuits[i] for i in runnable], repetitions=shots
+        )
+        # One Result per program, since no parameter sweeps are passed
+        for i, (result,) in zip(runnable, batch):
+            measurements = result.measurements
+            results[i] = (_score_measurements(measurements, patterns[i]), measurements, circuits[i])
+    return results
 
+def _score_measurements(measurements, pattern):
     # For multi-qubit patterns (CHAINED, ENTANGLED, CROSS_FUNCTION)
-    multi_qubit_patterns = ["CHAINED_QUANTUM_BOMB", "ENTANGLED_BOMB", "CROSS_FUNCTION_QUANTUM_BOMB"]
-    if pattern in multi_qubit_patterns:
+    if pattern in MULTI_QUBIT_PATTERNS:
         keys = list(measurements.keys())
         # Stack all measurement arrays [num_shots x num_qubits]
         combined = np.vstack([measurements[k].flatten() for k in keys])
@@ -114,35 +142,60 @@ def run_quantum_analysis(circuit, pattern="PROBABILISTIC_BOMB", shots=1024):
         key = list(measurements.keys())[0]
         score = np.mean(measurements[key])
 
-    return score, measurements, circuit
+    return score
 
-def format_score(score):
-    pct = f"{score * 100:.1f}%"
-    if score > 0.5:
-        return pct, "💀 EXTREME RISK"
-    elif score > 0.3:
-        return pct, "⚠️ HIGH RISK"
-    elif score > 0.1:
-        return pct, "LOW RISK"
+def format_score(score):
+    pct = f"{score * 100:.1f}%"
+    if score > 0.5:
+        return pct, "💀 EXTREME RISK"
+    elif score > 0.3:
+        return pct, "⚠️ HIGH RISK"
+    elif score > 0.1:
+        return pct, "LOW RISK"
     return pct, "SAFE"
 
 def circuit_to_text(circuit):
     return str(circuit)
 
-def visualize_quantum_state(circuit, title="Quantum State Probabilities"):
-    sim = cirq.Simulator()
-    result = sim.simulate(circuit)
+def freeze_args(args):
+    """
+    Turn a pattern kwargs dict into a hashable, order-independent key
+    (lists become tuples) for the cached helpers below.
+    """
+    return tuple(sorted(
+        (k, tuple(v) if isinstance(v, list) else v) for k, v in args.items()
+    ))
+
+@functools.lru_cache(maxsize=128)
+def cached_circuit_text(pattern, args_items=()):
+    """Circuit diagram for (pattern, freeze_args(kwargs)), rendered once per process."""
+    return circuit_to_text(build_quantum_circuit(pattern, **dict(args_items)))
+
+def visualize_quantum_state(circuit, title="Quantum State Probabilities", ax=None):
+    """
+    Render the state probabilities of `circuit` as a PNG buffer.
+    Pass `ax` to redraw onto an existing figure (e.g. one shared across a
+    per-pattern loop); the caller then owns the figure and must close it.
+    """
+    import matplotlib.pyplot as plt  # deferred: only chart rendering needs matplotlib
+    result = _SIMULATOR.simulate(circuit)
     state_vector = result.final_state_vector
     probs = np.abs(state_vector) ** 2
-    fig, ax = plt.subplots(figsize=(5, 2.5))
+    own_fig = ax is None
+    if own_fig:
+        fig, ax = plt.subplots(figsize=(5, 2.5))
+    else:
+        fig = ax.figure
+        ax.cla()
     ax.bar(range(len(probs)), probs)
     ax.set_xlabel("State")
     ax.set_ylabel("Probability")
     ax.set_title(title)
-    plt.tight_layout()
+    fig.tight_layout()
     buf = BytesIO()
-    plt.savefig(buf, format="png")
-    plt.close(fig)
+    fig.savefig(buf, format="png")
+    if own_fig:
+        plt.close(fig)
     buf.seek(0)
     return buf
 
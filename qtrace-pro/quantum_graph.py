@@ -3,6 +3,7 @@ import matplotlib.pyplot as plt
 from matplotlib.patches import Patch
 from matplotlib.lines import Line2D
 from io import BytesIO
+from utils import block_call_targets
 
 def plot_quantum_risk_graph(blocks, quantum_scores, entangled_pairs=None, anomaly_scores=None, title="Quantum Logic/Risk Graph", streamlit_buf=False):
     """
@@ -13,6 +14,7 @@ def plot_quantum_risk_graph(blocks, quantum_scores, entangled_pairs=None, anomal
     streamlit_buf: If True, returns BytesIO buffer for Streamlit; else plt.show()
     """
     G = nx.DiGraph()
+    call_targets = block_call_targets(blocks)
     for idx, block in enumerate(blocks):
         label = block['condition'][:30] + ("..." if len(block['condition']) > 30 else "")
         q_score = quantum_scores[idx]
@@ -25,10 +27,8 @@ def plot_quantum_risk_graph(blocks, quantum_scores, entangled_pairs=None, anomal
             "#2ecc71"
         )
         G.add_node(idx, label=label, quantum_score=q_score, color=color)
-        for call in block['calls']:
-            for tgt_idx, blk in enumerate(blocks):
-                if call in "".join(blk['body']):
-                    G.add_edge(idx, tgt_idx, weight=1, style="solid")
+        for tgt_idx in call_targets[idx]:
+            G.add_edge(idx, tgt_idx, weight=1, style="solid")
 
     # Entanglement/chain
     if entangled_pairs:
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The app modules are top-level scripts in qtrace-pro/, not an installed package
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
@@ -0,0 +1,53 @@
+from utils import block_call_targets, split_pattern_sections
+
+PATTERNS = ["PROBABILISTIC_BOMB", "QUANTUM_ANTIDEBUG"]
+
+
+def test_well_formed_reply_splits_per_pattern():
+    text = (
+        "Here is the analysis.\n"
+        "### PROBABILISTIC_BOMB\n"
+        "Random trigger guarding a shutdown.\n"
+        "\n"
+        "### `QUANTUM_ANTIDEBUG`\n"
+        "Sleeps when a debugger is attached.\n"
+    )
+    assert split_pattern_sections(text, PATTERNS) == {
+        "PROBABILISTIC_BOMB": "Random trigger guarding a shutdown.",
+        "QUANTUM_ANTIDEBUG": "Sleeps when a debugger is attached.",
+    }
+
+
+def test_missing_and_empty_sections_are_left_out():
+    text = "### PROBABILISTIC_BOMB\nRandom trigger.\n### QUANTUM_ANTIDEBUG\n   \n"
+    assert split_pattern_sections(text, PATTERNS) == {"PROBABILISTIC_BOMB": "Random trigger."}
+    assert split_pattern_sections("No headers at all.", PATTERNS) == {}
+
+
+def test_stray_all_caps_header_stays_in_section():
+    text = (
+        "### PROBABILISTIC_BOMB\n"
+        "Random trigger.\n"
+        "### WHY\n"
+        "Static tools miss it.\n"
+        "### ENTANGLED_BOMB\n"
+        "Not requested.\n"
+        "### QUANTUM_ANTIDEBUG\n"
+        "Sleeps under a debugger.\n"
+    )
+    sections = split_pattern_sections(text, PATTERNS)
+    assert set(sections) == set(PATTERNS)
+    assert sections["PROBABILISTIC_BOMB"] == (
+        "Random trigger.\n### WHY\nStatic tools miss it.\n### ENTANGLED_BOMB\nNot requested."
+    )
+    assert sections["QUANTUM_ANTIDEBUG"] == "Sleeps under a debugger."
+
+
+def test_block_call_targets_matches_calls_against_bodies():
+    blocks = [
+        {"condition": "a", "body": ["helper()", "run()"], "calls": ["helper", "missing"]},
+        {"condition": "b", "body": ["helper_two()"], "calls": ["helper"]},
+        {"condition": "c", "body": ["x = 1"], "body_joined": "run()", "calls": ["run"]},
+    ]
+    # "helper" is a substring of both bodies; block 2's precomputed body_joined is used
+    assert block_call_targets(blocks) == [[0, 1], [0, 1], [0, 2]]
@@ -1,3 +1,5 @@
+import re
+
 def format_score(score):
     """
     Convert quantum risk score (0.0-1.0) to percentage and label.
@@ -47,3 +49,40 @@ def is_quantum_pattern(pattern):
         "QUANTUM_ANTIDEBUG",
         "CROSS_FUNCTION_QUANTUM_BOMB"
     ]
+
+def block_call_targets(blocks):
+    """
+    For each logic block, the indices of the blocks whose body contains one of its
+    calls (substring match, one entry per matching (call, block) pair, in call order).
+    Each distinct call is resolved once; bodies use the block's 'body_joined' if set.
+    """
+    joined_bodies = [blk.get('body_joined') or "".join(blk['body']) for blk in blocks]
+    resolved = {}
+    targets = []
+    for block in blocks:
+        block_targets = []
+        for call in block['calls']:
+            if call not in resolved:
+                resolved[call] = [j for j, body in enumerate(joined_bodies) if call in body]
+            block_targets.extend(resolved[call])
+        targets.append(block_targets)
+    return targets
+
+def split_pattern_sections(text, patterns):
+    """
+    Split a batched Gemini reply into one section per requested pattern.
+    Only "### NAME" lines naming one of `patterns` start a section; any other
+    heading (e.g. "### WHY") stays in the surrounding section's text.
+    Returns: dict pattern -> section text, without empty or missing sections.
+    """
+    if not patterns:
+        return {}
+    names = "|".join(re.escape(p) for p in dict.fromkeys(patterns))
+    # re.split with one group yields [preamble, name1, body1, name2, body2, ...]
+    parts = re.split(rf"^#+\s*`?({names})`?\s*$", text, flags=re.MULTILINE)
+    sections = {}
+    for name, body in zip(parts[1::2], parts[2::2]):
+        body = body.strip()
+        if body and name not in sections:
+            sections[name] = body
+    return sections